@@ -4,22 +4,39 @@ Mushroom LED Controller - Main Application
 Run with: sudo python3 main.py
 """
 
+import os
 import time
 import signal
+import threading
 import sys
 import logging
+import logging.handlers
 import argparse
 import json
+from concurrent.futures import ThreadPoolExecutor
+import yaml
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent / 'src'))
 
+LOG_BUFFER_CAPACITY = 256  # Records held before a forced flush
+
 # Setup logging first
 logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    level=logging.WARNING,
+    format='%(name)s - %(levelname)s - %(message)s'
+)
+root_logger = logging.getLogger()
+log_buffer = logging.handlers.MemoryHandler(
+    LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=root_logger.handlers[0]
 )
+root_logger.handlers = [log_buffer]
 logger = logging.getLogger(__name__)
 
 from hardware.led_controller import LEDController
@@ -28,6 +45,8 @@ from patterns import PatternRegistry
 # Constants
 HEALTH_LOG_INTERVAL = 10.0  # Seconds between health logs
 HEALTH_CHECK_INTERVAL = 1.0  # Seconds between health checks
+METRICS_PATH = '/tmp/mushroom-metrics.json'
+METRICS_ENCODER = json.JSONEncoder(indent=2)  # Reused; json.dumps(indent=...) builds a new encoder per call
 
 
 class MushroomLights:
@@ -42,8 +61,16 @@ class MushroomLights:
         # Pattern registry
         self.registry = PatternRegistry()
         
-        # Control flags
-        self.running = True
+        # Class names of the active patterns, reported in exported metrics
+        self._cap_pattern_name = None
+        self._stem_pattern_name = None
+        self._last_metrics_signature = None
+        
+        # Opened when run() starts and rewritten in place by each export; None disables export
+        self._metrics_fd = None
+        
+        # Set by signal handlers or health failures to stop the main loop
+        self._stop = threading.Event()
         
         # Setup signal handlers for clean shutdown
         signal.signal(signal.SIGINT, self.signal_handler)
@@ -54,7 +81,7 @@ class MushroomLights:
     def signal_handler(self, sig, frame):
         """Handle shutdown signals"""
         logger.info("Shutdown signal received")
-        self.running = False
+        self._stop.set()
     
     def set_patterns(self, cap_pattern_name: str, stem_pattern_name: str) -> bool:
         """
@@ -69,47 +96,69 @@ class MushroomLights:
         """
         success = True
         
-        # Create cap pattern with dynamic LED count from config
-        if cap_pattern_name:
-            cap_pattern = self.registry.create_pattern(cap_pattern_name, self.controller.cap_led_count)
+        # Cap and stem patterns are independent, so construct them concurrently
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            cap_future = stem_future = None
+            if cap_pattern_name:
+                cap_future = executor.submit(self.registry.create_pattern, cap_pattern_name, self.controller.cap_led_count)
+            if stem_pattern_name:
+                stem_future = executor.submit(self.registry.create_pattern, stem_pattern_name, self.controller.stem_led_count)
+        
+        if cap_future:
+            cap_pattern = cap_future.result()
             if cap_pattern:
                 self.controller.set_cap_pattern(cap_pattern)
-                logger.info(f"Set cap pattern: {cap_pattern_name} ({self.controller.cap_led_count} LEDs)")
+                self._cap_pattern_name = cap_pattern.__class__.__name__
+                logger.info("Set cap pattern: %s (%d LEDs)", cap_pattern_name, self.controller.cap_led_count)
             else:
-                logger.error(f"Failed to create cap pattern: {cap_pattern_name}")
+                logger.error("Failed to create cap pattern: %s", cap_pattern_name)
                 success = False
         
-        # Create stem pattern with dynamic LED count from config
-        if stem_pattern_name:
-            stem_pattern = self.registry.create_pattern(stem_pattern_name, self.controller.stem_led_count)
+        if stem_future:
+            stem_pattern = stem_future.result()
             if stem_pattern:
                 self.controller.set_stem_pattern(stem_pattern)
-                logger.info(f"Set stem pattern: {stem_pattern_name} ({self.controller.stem_led_count} LEDs)")
+                self._stem_pattern_name = stem_pattern.__class__.__name__
+                logger.info("Set stem pattern: %s (%d LEDs)", stem_pattern_name, self.controller.stem_led_count)
             else:
-                logger.error(f"Failed to create stem pattern: {stem_pattern_name}")
+                logger.error("Failed to create stem pattern: %s", stem_pattern_name)
                 success = False
         
         return success
     
+    def cleanup(self):
+        """Stop the controller and release the metrics file"""
+        self.controller.cleanup()
+        if self._metrics_fd is not None:
+            os.close(self._metrics_fd)
+            self._metrics_fd = None
+    
     def run(self):
         """Main application loop - monitors health"""
+        try:
+            self._metrics_fd = os.open(METRICS_PATH, os.O_WRONLY | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning("Metrics export disabled, cannot open %s: %s", METRICS_PATH, e)
+        
         logger.info("Starting LED controller threads...")
         
         # Start the controller (starts all threads)
         self.controller.start()
         
         # Health monitoring
-        last_health_log = time.time()
-        last_health_check = time.time()
+        last_health_log = time.monotonic()
+        last_health_check = last_health_log
         
         try:
             logger.info("Controller running. Press Ctrl+C to stop.")
             
-            while self.running:
-                current_time = time.time()
+            while not self._stop.is_set():
+                current_time = time.monotonic()
+                since_check = current_time - last_health_check
+                since_log = current_time - last_health_log
                 
                 # Check health periodically
-                if current_time - last_health_check >= HEALTH_CHECK_INTERVAL:
+                if since_check >= HEALTH_CHECK_INTERVAL:
                     health = self.controller.get_health()
                     
                     # Check for thread failures
@@ -118,61 +167,62 @@ class MushroomLights:
                     
                     if not cap_health['pattern_alive'] or not cap_health['spi_alive']:
                         logger.error("Cap controller thread died!")
-                        self.running = False
+                        self._stop.set()
                         break
                     
                     if not stem_health['pattern_alive'] or not stem_health['spi_alive']:
                         logger.error("Stem controller thread died!")
-                        self.running = False
+                        self._stop.set()
                         break
                     
-                    # Check for excessive errors
-                    if cap_health['pattern_errors'] >= 3 or cap_health['spi_errors'] >= 3:
+                    # Check for excessive errors, at the same limit the controller threads use
+                    max_errors = self.controller.max_consecutive_errors
+                    if cap_health['pattern_errors'] >= max_errors or cap_health['spi_errors'] >= max_errors:
                         logger.error("Cap controller has too many errors!")
-                        self.running = False
+                        self._stop.set()
                         break
                     
-                    if stem_health['pattern_errors'] >= 3 or stem_health['spi_errors'] >= 3:
+                    if stem_health['pattern_errors'] >= max_errors or stem_health['spi_errors'] >= max_errors:
                         logger.error("Stem controller has too many errors!")
-                        self.running = False
+                        self._stop.set()
                         break
                     
+                    log_buffer.flush()
                     last_health_check = current_time
                 
                 # Log performance periodically
-                if current_time - last_health_log >= HEALTH_LOG_INTERVAL:
+                if since_log >= HEALTH_LOG_INTERVAL:
                     stats = self.controller.get_stats()
-                    # With serialized SPI, both strips run at same effective rate
-                    effective_fps = min(stats['cap_fps'], stats['stem_fps']) if stats['cap_fps'] > 0 and stats['stem_fps'] > 0 else max(stats['cap_fps'], stats['stem_fps'])
-                    logger.info(
-                        f"Performance | FPS: {effective_fps:.1f} | "
-                        f"Frames: {stats['cap_frames'] + stats['stem_frames']} | "
-                        f"Errors: {stats['cap_errors'] + stats['stem_errors']}"
-                    )
+                    if logger.isEnabledFor(logging.INFO):
+                        # With serialized SPI, both strips run at same effective rate
+                        effective_fps = min(stats['cap_fps'], stats['stem_fps']) if stats['cap_fps'] > 0 and stats['stem_fps'] > 0 else max(stats['cap_fps'], stats['stem_fps'])
+                        logger.info(
+                            "Performance | FPS: %.1f | Frames: %d | Errors: %d",
+                            effective_fps,
+                            stats['cap_frames'] + stats['stem_frames'],
+                            stats['cap_errors'] + stats['stem_errors']
+                        )
                     
-                    # Export performance metrics to JSON
-                    try:
-                        # Get pattern names safely
-                        cap_pattern_name = None
-                        stem_pattern_name = None
-                        
-                        if hasattr(self.controller, 'cap_pattern') and self.controller.cap_pattern:
-                            cap_pattern_name = self.controller.cap_pattern.__class__.__name__
-                        
-                        if hasattr(self.controller, 'stem_pattern') and self.controller.stem_pattern:
-                            stem_pattern_name = self.controller.stem_pattern.__class__.__name__
-                        
+                    # Export performance metrics to JSON, skipped when no counter moved
+                    metrics_signature = (
+                        stats['cap_frames'],
+                        stats['stem_frames'],
+                        self.controller.frames_skipped,
+                        stats['cap_errors'] + stats['stem_errors']
+                    )
+                    if self._metrics_fd is not None and metrics_signature != self._last_metrics_signature:
                         metrics = {
-                            'timestamp': current_time,
+                            'timestamp': time.time(),
                             'fps': self.controller.current_fps,
                             'frames_sent': self.controller.frames_sent,
+                            'frames_skipped': self.controller.frames_skipped,
                             'led_counts': {
                                 'cap': self.controller.cap_led_count,
                                 'stem': self.controller.stem_led_count
                             },
                             'patterns': {
-                                'cap': cap_pattern_name,
-                                'stem': stem_pattern_name
+                                'cap': self._cap_pattern_name,
+                                'stem': self._stem_pattern_name
                             },
                             'timing_ms': {
                                 'pattern_wait': self.controller.last_pattern_wait_ms,
@@ -182,48 +232,48 @@ class MushroomLights:
                                 'stem_generation': self.controller.last_stem_generation_ms
                             }
                         }
-                        with open('/tmp/mushroom-metrics.json', 'w') as f:
-                            json.dump(metrics, f, indent=2)
-                    except Exception as e:
-                        logger.debug(f"Failed to export metrics: {e}")
+                        payload = METRICS_ENCODER.encode(metrics).encode()
+                        try:
+                            os.pwrite(self._metrics_fd, payload, 0)
+                            os.ftruncate(self._metrics_fd, len(payload))
+                        except OSError as e:
+                            logger.debug("Failed to export metrics: %s", e)
+                        
+                        self._last_metrics_signature = metrics_signature
                     
                     last_health_log = current_time
                 
-                # Sleep briefly to avoid busy waiting
-                time.sleep(0.1)
+                next_deadline = min(last_health_check + HEALTH_CHECK_INTERVAL,
+                                    last_health_log + HEALTH_LOG_INTERVAL)
+                self._stop.wait(max(0.0, next_deadline - current_time))
         
         except Exception as e:
-            logger.error(f"Error in main loop: {e}", exc_info=True)
+            logger.error("Error in main loop: %s", e, exc_info=True)
         
         finally:
             # Clean shutdown
             logger.info("Shutting down...")
-            self.controller.cleanup()
+            self.cleanup()
             logger.info("Shutdown complete")
+            log_buffer.flush()
 
 
 def main():
     """Entry point"""
-    # Get available patterns from registry
-    available_patterns = PatternRegistry().list_patterns()
-    
     parser = argparse.ArgumentParser(description='Mushroom LED Controller')
     parser.add_argument(
         '--cap-pattern',
         default=None,
-        choices=available_patterns if available_patterns else None,
         help='Pattern for cap LEDs'
     )
     parser.add_argument(
         '--stem-pattern',
         default=None,
-        choices=available_patterns if available_patterns else None,
         help='Pattern for stem LEDs'
     )
     parser.add_argument(
         '--pattern', '-p',
         default=None,
-        choices=available_patterns if available_patterns else None,
         help='Pattern for both cap and stem (overrides individual patterns)'
     )
     parser.add_argument(
@@ -264,15 +314,27 @@ def main():
         action='store_true',
         help='List available patterns and exit'
     )
+    parser.add_argument(
+        '--verbose', '-v',
+        action='store_true',
+        help='Enable INFO-level logging'
+    )
     
     args = parser.parse_args()
     
+    if args.verbose:
+        logging.getLogger().setLevel(logging.INFO)
+    
     # Handle list patterns request
     if args.list_patterns:
-        for pattern in available_patterns:
+        for pattern in PatternRegistry.list_patterns():
             print(pattern)
         sys.exit(0)
     
+    for name in (args.cap_pattern, args.stem_pattern, args.pattern):
+        if name and PatternRegistry.get_pattern(name) is None:
+            parser.error(f"unknown pattern '{name}' (choose from {', '.join(PatternRegistry.list_patterns())})")
+    
     # Determine patterns to use
     cap_pattern = None
     stem_pattern = None
@@ -283,17 +345,16 @@ def main():
     # Load startup configuration if it exists and not disabled
     if not args.no_startup_config and Path(args.startup_config).exists():
         try:
-            import yaml
             with open(args.startup_config, 'r') as f:
-                startup = yaml.safe_load(f)
+                startup = yaml.load(f, Loader=YamlLoader)
                 cap_pattern = startup.get('cap_pattern', 'rainbow')
                 stem_pattern = startup.get('stem_pattern', 'rainbow')
                 brightness = startup.get('brightness', 128)
                 cap_brightness = startup.get('cap_brightness')
                 stem_brightness = startup.get('stem_brightness')
-                logger.info(f"Loaded startup config from {args.startup_config}")
+                logger.info("Loaded startup config from %s", args.startup_config)
         except Exception as e:
-            logger.warning(f"Could not load startup config: {e}")
+            logger.warning("Could not load startup config: %s", e)
     
     # Command line arguments override startup config
     if args.pattern:
@@ -310,10 +371,10 @@ def main():
     # Default patterns if none specified
     if not cap_pattern:
         cap_pattern = 'rainbow'
-        logger.info(f"No cap pattern specified, using default: {cap_pattern}")
+        logger.info("No cap pattern specified, using default: %s", cap_pattern)
     if not stem_pattern:
         stem_pattern = 'rainbow'
-        logger.info(f"No stem pattern specified, using default: {stem_pattern}")
+        logger.info("No stem pattern specified, using default: %s", stem_pattern)
     
     # Brightness overrides
     if args.brightness is not None:
@@ -334,13 +395,13 @@ def main():
     # Set brightness
     if brightness is not None:
         app.controller.set_brightness(brightness)
-        logger.info(f"Set global brightness to {brightness}")
+        logger.info("Set global brightness to %d", brightness)
     if cap_brightness is not None:
         app.controller.set_cap_brightness(cap_brightness)
-        logger.info(f"Set cap brightness to {cap_brightness}")
+        logger.info("Set cap brightness to %d", cap_brightness)
     if stem_brightness is not None:
         app.controller.set_stem_brightness(stem_brightness)
-        logger.info(f"Set stem brightness to {stem_brightness}")
+        logger.info("Set stem brightness to %d", stem_brightness)
     
     # Run
     app.run()
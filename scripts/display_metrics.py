@@ -3,11 +3,27 @@
 Display performance metrics from mushroom LED controller
 """
 
-import json
 import time
 import sys
 import os
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# The controller rewrites the file in place, so a read can land mid-rewrite - retry briefly
+READ_ATTEMPTS = 5
+READ_RETRY_DELAY = 0.02  # Seconds
+
+STRIP_TEMPLATE = '{strip} ({led_count} LEDs, {pattern} pattern)\n'
+TIMING_TEMPLATE = '  {label:<13} {value:.1f}ms\n'
+TIMING_LABELS = (
+    ('pattern_wait', 'Pattern wait:'),
+    ('buffer_prep', 'Buffer prep:'),
+    ('spi_transmit', 'SPI transmit:'),
+)
+
 def main():
     metrics_file = '/tmp/mushroom-metrics.json'
     
@@ -18,12 +34,19 @@ def main():
         print("  ./run.sh start")
         sys.exit(1)
     
-    try:
-        with open(metrics_file, 'r') as f:
-            data = json.load(f)
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"Error reading metrics: {e}")
-        sys.exit(1)
+    for attempt in range(READ_ATTEMPTS):
+        try:
+            with open(metrics_file, 'rb') as f:
+                data = json_loads(f.read())
+            break
+        except ValueError as e:
+            if attempt == READ_ATTEMPTS - 1:
+                print(f"Error reading metrics: {e}")
+                sys.exit(1)
+            time.sleep(READ_RETRY_DELAY)
+        except OSError as e:
+            print(f"Error reading metrics: {e}")
+            sys.exit(1)
     
     # Validate required fields exist
     if 'timestamp' not in data:
@@ -33,40 +56,44 @@ def main():
     # Calculate age of data
     age = int(time.time() - data['timestamp'])
     
-    print('=== Performance Metrics ===')
-    print(f'Data age: {age} seconds ago\n')
+    out = ['=== Performance Metrics ===\n']
+    out.append(f'Data age: {age} seconds ago\n\n')
     
     # Display patterns if available
     if 'patterns' in data and 'led_counts' in data:
         for strip in ['cap', 'stem']:
             if strip in data['patterns'] and strip in data['led_counts']:
-                pattern = data['patterns'][strip]
-                led_count = data['led_counts'][strip]
-                print(f'{strip.upper()} ({led_count} LEDs, {pattern} pattern)')
-        print()
+                out.append(STRIP_TEMPLATE.format(
+                    strip=strip.upper(),
+                    led_count=data['led_counts'][strip],
+                    pattern=data['patterns'][strip]
+                ))
+        out.append('\n')
     
     # Display FPS if available  
     if 'fps' in data and 'frames_sent' in data:
-        print(f'FPS: {data["fps"]:.1f}')
-        print(f'Frames sent: {data["frames_sent"]}')
+        out.append(f'FPS: {data["fps"]:.1f}\n')
+        out.append(f'Frames sent: {data["frames_sent"]}\n')
+        if 'frames_skipped' in data:
+            out.append(f'Frames skipped (unchanged): {data["frames_skipped"]}\n')
     else:
-        print('Performance data not yet available')
+        out.append('Performance data not yet available\n')
     
     # Display timing breakdown if available
     if 'timing_ms' in data:
-        print()
-        print('Timing breakdown (last frame):')
+        out.append('\n')
+        out.append('Timing breakdown (last frame):\n')
         timing = data['timing_ms']
-        if 'pattern_wait' in timing:
-            print(f'  Pattern wait: {timing["pattern_wait"]:.1f}ms')
-        if 'buffer_prep' in timing:
-            print(f'  Buffer prep:  {timing["buffer_prep"]:.1f}ms')
-        if 'spi_transmit' in timing:
-            print(f'  SPI transmit: {timing["spi_transmit"]:.1f}ms')
+        for key, label in TIMING_LABELS:
+            if key in timing:
+                out.append(TIMING_TEMPLATE.format(label=label, value=timing[key]))
         
         if 'buffer_prep' in timing and 'spi_transmit' in timing:
             total_ms = timing['buffer_prep'] + timing['spi_transmit']
-            print(f'  Total frame:  {total_ms:.1f}ms')
+            out.append(TIMING_TEMPLATE.format(label='Total frame:', value=total_ms))
+    
+    sys.stdout.write(''.join(out))
+    sys.stdout.flush()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -5,10 +5,28 @@ Audio Device - USB audio device detection
 
 import sounddevice as sd
 import logging
+import re
+import time
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+DEVICE_CACHE_TTL = 5.0  # Seconds before the PortAudio device list is re-queried
+USB_DEVICE_RE = re.compile(r'usb|audio adapter|au-mmsa', re.IGNORECASE)  # Common USB audio adapter identifiers
+
+_devices_cache: Optional[tuple] = None
+_cache_time = 0.0
+
+
+def _get_devices() -> tuple:
+    """Return the PortAudio device list, re-querying at most every DEVICE_CACHE_TTL seconds"""
+    global _devices_cache, _cache_time
+    now = time.monotonic()
+    if _devices_cache is None or now - _cache_time >= DEVICE_CACHE_TTL:
+        _devices_cache = tuple(sd.query_devices())
+        _cache_time = now
+    return _devices_cache
+
 
 class AudioDevice:
     """Finds and validates USB audio device at startup"""
@@ -25,31 +43,38 @@ class AudioDevice:
             Device ID or None if not found
         """
         try:
-            devices = sd.query_devices()
-            
-            # If specific device name provided, look for exact match first
+            devices = _get_devices()
+            prefer_re = None
             if prefer_device and prefer_device != 'USB':
-                for i, device in enumerate(devices):
-                    if device['max_input_channels'] > 0:
-                        if prefer_device.lower() in device['name'].lower():
-                            logger.info(f"Found preferred device: {device['name']} (ID: {i})")
-                            return i
+                prefer_re = re.compile(re.escape(prefer_device), re.IGNORECASE)
             
-            # Look for USB device
+            # Single pass: a preferred-name match wins outright, then the first
+            # USB device, then the first input device of any kind
+            usb_id = None
+            fallback_id = None
             for i, device in enumerate(devices):
-                if device['max_input_channels'] > 0:
-                    device_name = device['name'].lower()
-                    # Common USB audio adapter identifiers
-                    if any(usb_hint in device_name for usb_hint in ['usb', 'audio adapter', 'au-mmsa']):
-                        logger.info(f"Found USB audio device: {device['name']} (ID: {i})")
+                if device['max_input_channels'] <= 0:
+                    continue
+                name = device['name']
+                if prefer_re is not None and prefer_re.search(name):
+                    logger.info(f"Found preferred device: {name} (ID: {i})")
+                    return i
+                if usb_id is None and USB_DEVICE_RE.search(name):
+                    if prefer_re is None:
+                        logger.info(f"Found USB audio device: {name} (ID: {i})")
                         return i
+                    usb_id = i
+                if fallback_id is None:
+                    fallback_id = i
+            
+            if usb_id is not None:
+                logger.info(f"Found USB audio device: {devices[usb_id]['name']} (ID: {usb_id})")
+                return usb_id
+            
+            if fallback_id is not None:
+                logger.warning(f"No USB device found, using: {devices[fallback_id]['name']} (ID: {fallback_id})")
+                return fallback_id
             
-            # Fallback to first available input device
-            for i, device in enumerate(devices):
-                if device['max_input_channels'] > 0:
-                    logger.warning(f"No USB device found, using: {device['name']} (ID: {i})")
-                    return i
-                    
             logger.error("No audio input devices found")
             return None
             
@@ -69,30 +94,26 @@ class AudioDevice:
         Returns:
             True if device is valid
         """
+        # check_input_settings queries the device itself; only look it up to explain a failure
         try:
-            device_info = sd.query_devices(device_id, 'input')
-            
-            # Check if device has input channels
-            if device_info['max_input_channels'] < 1:
+            sd.check_input_settings(
+                device=device_id,
+                channels=1,
+                samplerate=sample_rate
+            )
+            logger.info(f"Device {device_id} validated at {sample_rate}Hz")
+            return True
+        except Exception as e:
+            error = e
+        
+        try:
+            if _get_devices()[device_id]['max_input_channels'] < 1:
                 logger.error(f"Device {device_id} has no input channels")
-                return False
-            
-            # Check sample rate support
-            try:
-                sd.check_input_settings(
-                    device=device_id,
-                    channels=1,
-                    samplerate=sample_rate
-                )
-                logger.info(f"Device {device_id} validated at {sample_rate}Hz")
-                return True
-            except Exception as e:
-                logger.error(f"Device {device_id} doesn't support {sample_rate}Hz: {e}")
-                return False
-                
+            else:
+                logger.error(f"Device {device_id} doesn't support {sample_rate}Hz: {error}")
         except Exception as e:
             logger.error(f"Error validating device {device_id}: {e}")
-            return False
+        return False
     
     @staticmethod
     def get_device_info(device_id: Optional[int] = None) -> Dict[str, Any]:
@@ -109,7 +130,12 @@ class AudioDevice:
             if device_id is None:
                 device_id = sd.default.device[0]  # Input device
             
-            info = sd.query_devices(device_id, 'input')
+            devices = _get_devices()
+            if not 0 <= device_id < len(devices):
+                raise ValueError(f"No input device with id {device_id}")
+            info = devices[device_id]
+            if info['max_input_channels'] < 1:
+                raise ValueError(f"Device {device_id} ({info['name']}) has no input channels")
             return {
                 'id': device_id,
                 'name': info['name'],
@@ -41,6 +41,7 @@ class AudioStream:
         self.buffer_size = config.get('buffer_size', 512)
         self.device_id = config.get('device_id', None)
         self.gain = config.get('gain', 1.0)  # Software gain multiplier
+        self.latency = config.get('latency', 'low')  # PortAudio latency: 'low', 'high' or seconds
         
         # Signal monitoring
         self.current_level = 0.0
@@ -80,13 +81,14 @@ class AudioStream:
                 channels=1,
                 samplerate=self.sample_rate,
                 blocksize=self.buffer_size,
+                latency=self.latency,
                 dtype=np.float32
             )
             
             self.stream.start()
-            self.start_time = time.time()
+            self.start_time = time.monotonic()
             
-            logger.info(f"Audio stream started on '{self.device_info['name']}'")
+            logger.info(f"Audio stream started on '{self.device_info['name']}' ({self.stream.latency * 1000:.1f}ms input latency)")
             return True
             
         except Exception as e:
@@ -108,37 +110,7 @@ class AudioStream:
             available = self.stream.read_available
             if available > 0:
                 # Read available frames (may be more or less than buffer_size)
-                audio_data, overflowed = self.stream.read(available)
-                
-                if overflowed:
-                    logger.debug("Audio buffer overflow detected")
-                
-                # Flatten to mono if needed
-                if audio_data.ndim > 1:
-                    audio_data = audio_data[:, 0]
-                
-                # Apply gain if needed
-                if self.gain != 1.0:
-                    audio_data = np.clip(audio_data * self.gain, -1.0, 1.0)
-                
-                # Update statistics
-                self.frames_read += len(audio_data)
-                
-                # Calculate signal levels (after gain)
-                self.current_level = float(np.sqrt(np.mean(audio_data**2)))
-                peak = float(np.max(np.abs(audio_data)))
-                self.peak_level = max(peak, self.peak_level * self.peak_decay)
-                
-                # Cache the audio
-                if len(audio_data) >= self.buffer_size:
-                    # Take last buffer_size samples if we got more
-                    self.last_audio = audio_data[-self.buffer_size:].copy()
-                else:
-                    # Pad with zeros if we got less
-                    self.last_audio[:len(audio_data)] = audio_data
-                    self.last_audio[len(audio_data):] = 0
-                
-                return self.last_audio
+                return self._process(*self.stream.read(available))
             else:
                 # No new data available, return cached
                 return self.last_audio
@@ -147,6 +119,58 @@ class AudioStream:
             logger.error(f"Error reading audio stream: {e}")
             return self.last_audio
     
+    def read_block(self) -> np.ndarray:
+        """
+        Blocking read of the next buffer_size samples
+        
+        Sleeps inside PortAudio until a full block has arrived, so callers can
+        pace themselves on audio instead of polling read_latest.
+        
+        Returns:
+            Audio data (cached data if the stream is not active)
+        """
+        if not self.stream or not self.stream.active:
+            return self.last_audio
+        
+        try:
+            return self._process(*self.stream.read(self.buffer_size))
+        except Exception as e:
+            logger.error(f"Error reading audio stream: {e}")
+            return self.last_audio
+    
+    def _process(self, audio_data: np.ndarray, overflowed: bool) -> np.ndarray:
+        """Apply gain, update levels and cache a freshly read block"""
+        if overflowed:
+            logger.debug("Audio buffer overflow detected")
+        
+        # Flatten to mono if needed
+        if audio_data.ndim > 1:
+            audio_data = audio_data[:, 0]
+        
+        # Apply gain if needed, in place on the freshly read block
+        if self.gain != 1.0:
+            audio_data *= self.gain
+            np.clip(audio_data, -1.0, 1.0, out=audio_data)
+        
+        # Update statistics
+        self.frames_read += len(audio_data)
+        
+        # Calculate signal levels (after gain)
+        self.current_level = float(np.sqrt(np.dot(audio_data, audio_data) / audio_data.size))
+        peak = float(max(audio_data.max(), -audio_data.min()))
+        self.peak_level = max(peak, self.peak_level * self.peak_decay)
+        
+        # Cache the audio
+        if len(audio_data) >= self.buffer_size:
+            # Take last buffer_size samples if we got more
+            np.copyto(self.last_audio, audio_data[-self.buffer_size:])
+        else:
+            # Pad with zeros if we got less
+            self.last_audio[:len(audio_data)] = audio_data
+            self.last_audio[len(audio_data):].fill(0)
+        
+        return self.last_audio
+    
     def stop(self):
         """Stop audio stream"""
         if self.stream:
@@ -171,7 +195,7 @@ class AudioStream:
             current_level=self.current_level,
             peak_level=self.peak_level,
             frames_read=self.frames_read,
-            uptime=time.time() - self.start_time if self.start_time else 0
+            uptime=time.monotonic() - self.start_time if self.start_time else 0
         )
     
     def reset_peak(self):
@@ -4,8 +4,47 @@ Audio Utilities - Helper functions for audio-reactive patterns
 Simple tools that patterns can optionally use for audio processing
 """
 
+import threading
 import numpy as np
-from typing import Optional, Tuple
+from scipy.fft import rfft
+from typing import Dict, Optional, Tuple
+
+SILENCE_THRESHOLD = 1e-4  # Peak sample level below which a block is treated as silence
+
+# Frequency ranges (Hz) for bass, mid and treble bands
+BAND_RANGES = ((20, 250), (250, 2000), (2000, 8000))
+
+# Per-thread magnitude scratch buffer - patterns may call in from several threads
+_scratch = threading.local()
+
+# rFFT bin slice and mean scale per band, keyed by (sample count, sample rate)
+_BAND_CACHE: Dict[Tuple[int, int], Tuple[Tuple[slice, float], ...]] = {}
+
+
+def _band_slices(n: int, sample_rate: int) -> Tuple[Tuple[slice, float], ...]:
+    """
+    Return (bins, scale) for each band in BAND_RANGES
+    
+    bins is the contiguous rFFT bin slice for the band and scale is 1/len(bins),
+    or 0.0 for a band with no bins at this resolution, so sum * scale is the mean
+    (0.0 when empty) without a per-call emptiness check.
+    """
+    key = (n, sample_rate)
+    bands = _BAND_CACHE.get(key)
+    if bands is None:
+        freqs = np.fft.rfftfreq(n, 1 / sample_rate)
+        bands = []
+        for low, high in BAND_RANGES:
+            start, stop = int(np.searchsorted(freqs, low)), int(np.searchsorted(freqs, high))
+            bands.append((slice(start, stop), 1.0 / (stop - start) if stop > start else 0.0))
+        bands = tuple(bands)
+        _BAND_CACHE[key] = bands
+    return bands
+
+
+def _rms(audio_data: np.ndarray) -> float:
+    """RMS of a block of any shape in one BLAS dot pass, in the block's own dtype (float32 from sounddevice)"""
+    return float(np.sqrt(np.vdot(audio_data, audio_data) / audio_data.size))
 
 
 def get_volume(audio_data: np.ndarray, gain: float = 1.0) -> float:
@@ -23,11 +62,11 @@ def get_volume(audio_data: np.ndarray, gain: float = 1.0) -> float:
         return 0.0
     
     # Calculate RMS (Root Mean Square) for perceived loudness
-    rms = np.sqrt(np.mean(audio_data**2))
+    rms = _rms(audio_data)
     
     # Apply gain and clip to 0-1 range
     volume = rms * gain
-    return np.clip(volume, 0.0, 1.0)
+    return min(1.0, max(0.0, volume))
 
 
 def get_peak(audio_data: np.ndarray, gain: float = 1.0) -> float:
@@ -45,7 +84,7 @@ def get_peak(audio_data: np.ndarray, gain: float = 1.0) -> float:
         return 0.0
     
     peak = np.max(np.abs(audio_data)) * gain
-    return np.clip(peak, 0.0, 1.0)
+    return min(1.0, max(0.0, float(peak)))
 
 
 def get_frequency_bands(audio_data: np.ndarray, sample_rate: int = 44100, 
@@ -64,30 +103,29 @@ def get_frequency_bands(audio_data: np.ndarray, sample_rate: int = 44100,
     if audio_data is None or len(audio_data) == 0:
         return (0.0, 0.0, 0.0)
     
-    # Simple FFT to get frequency content
-    fft = np.fft.rfft(audio_data)
-    freqs = np.fft.rfftfreq(len(audio_data), 1/sample_rate)
-    magnitudes = np.abs(fft)
+    # Silent blocks have no band content worth an FFT
+    if max(audio_data.max(), -audio_data.min()) < SILENCE_THRESHOLD:
+        return (0.0, 0.0, 0.0)
     
-    # Define frequency ranges (Hz)
-    bass_range = (20, 250)
-    mid_range = (250, 2000)
-    treble_range = (2000, 8000)
+    # Simple FFT to get frequency content
+    fft = rfft(audio_data)
+    magnitudes = getattr(_scratch, 'magnitudes', None)
+    if magnitudes is None or magnitudes.shape != fft.shape or magnitudes.dtype != fft.real.dtype:
+        magnitudes = _scratch.magnitudes = np.empty(fft.shape, dtype=fft.real.dtype)
+    np.abs(fft, out=magnitudes)
     
     # Calculate average magnitude in each range
-    bass_mask = (freqs >= bass_range[0]) & (freqs < bass_range[1])
-    mid_mask = (freqs >= mid_range[0]) & (freqs < mid_range[1])
-    treble_mask = (freqs >= treble_range[0]) & (freqs < treble_range[1])
-    
-    bass = np.mean(magnitudes[bass_mask]) if np.any(bass_mask) else 0.0
-    mid = np.mean(magnitudes[mid_mask]) if np.any(mid_mask) else 0.0
-    treble = np.mean(magnitudes[treble_mask]) if np.any(treble_mask) else 0.0
+    bands = _band_slices(len(audio_data), sample_rate)
+    (bass_bins, bass_scale), (mid_bins, mid_scale), (treble_bins, treble_scale) = bands
+    bass = float(magnitudes[bass_bins].sum()) * bass_scale
+    mid = float(magnitudes[mid_bins].sum()) * mid_scale
+    treble = float(magnitudes[treble_bins].sum()) * treble_scale
     
     # Normalize and apply gain
     # Note: These scaling factors may need tuning based on actual audio
-    bass = np.clip(bass * gain * 0.01, 0.0, 1.0)
-    mid = np.clip(mid * gain * 0.01, 0.0, 1.0)
-    treble = np.clip(treble * gain * 0.01, 0.0, 1.0)
+    bass = min(1.0, max(0.0, bass * gain * 0.01))
+    mid = min(1.0, max(0.0, mid * gain * 0.01))
+    treble = min(1.0, max(0.0, treble * gain * 0.01))
     
     return (bass, mid, treble)
 
@@ -102,7 +140,7 @@ class AudioSmoother:
         Args:
             smoothing: 0.0 = no smoothing, 0.99 = heavy smoothing
         """
-        self.smoothing = np.clip(smoothing, 0.0, 0.99)
+        self.smoothing = min(0.99, max(0.0, smoothing))
         self.value = 0.0
     
     def update(self, new_value: float) -> float:
@@ -137,8 +175,13 @@ class BeatDetector:
         self.threshold = threshold
         self.cooldown = cooldown
         self.cooldown_counter = 0
-        self.history = []
         self.history_size = 30  # Frames of history to keep
+        
+        # Ring buffer of recent volumes with a running sum for the average
+        self.history = np.zeros(self.history_size)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
     
     def detect(self, volume: float) -> bool:
         """
@@ -150,13 +193,15 @@ class BeatDetector:
         Returns:
             True if beat detected
         """
-        # Add to history
-        self.history.append(volume)
-        if len(self.history) > self.history_size:
-            self.history.pop(0)
+        # Add to history, overwriting the oldest entry once full
+        self._sum += volume - self.history[self._index]
+        self.history[self._index] = volume
+        self._index = (self._index + 1) % self.history_size
+        if self._count < self.history_size:
+            self._count += 1
         
         # Need enough history
-        if len(self.history) < 10:
+        if self._count < 10:
             return False
         
         # Check cooldown
@@ -165,7 +210,7 @@ class BeatDetector:
             return False
         
         # Compare to recent average
-        avg = np.mean(self.history[:-1])  # Exclude current
+        avg = (self._sum - volume) / (self._count - 1)  # Exclude current
         
         # Beat if current is significantly above average
         if volume > avg * self.threshold and volume > 0.1:
@@ -176,7 +221,10 @@ class BeatDetector:
     
     def reset(self):
         """Reset detector state"""
-        self.history.clear()
+        self.history.fill(0.0)
+        self._index = 0
+        self._count = 0
+        self._sum = 0.0
         self.cooldown_counter = 0
 
 
@@ -194,7 +242,7 @@ def normalize_audio(audio_data: np.ndarray, target_level: float = 0.5) -> np.nda
     if audio_data is None or len(audio_data) == 0:
         return audio_data
     
-    current_rms = np.sqrt(np.mean(audio_data**2))
+    current_rms = _rms(audio_data)
     
     if current_rms > 0:
         scale = target_level / current_rms
@@ -4,8 +4,8 @@ Color utilities and predefined palettes for the mushroom
 """
 
 import numpy as np
-import cv2
-from typing import Tuple, List
+from functools import lru_cache
+from typing import Tuple, List, Optional
 
 
 # Mushroom-inspired color palettes (from research document)
@@ -48,6 +48,17 @@ PALETTES = {
 }
 
 
+# (r, g, b) source for each hue sector, indexing the stacked (v, q, p, t) components
+HSV_SECTOR_COMPONENTS = np.array([
+    [0, 3, 2],  # 0-60: v, t, p
+    [1, 0, 2],  # 60-120: q, v, p
+    [2, 0, 3],  # 120-180: p, v, t
+    [2, 1, 0],  # 180-240: p, q, v
+    [3, 2, 0],  # 240-300: t, p, v
+    [0, 2, 1],  # 300-360: v, p, q
+])
+
+
 def interpolate_color(color1: Tuple[int, int, int], 
                      color2: Tuple[int, int, int], 
                      t: float) -> Tuple[int, int, int]:
@@ -55,7 +66,7 @@ def interpolate_color(color1: Tuple[int, int, int],
     Linearly interpolate between two colors
     t: 0.0 = color1, 1.0 = color2
     """
-    t = np.clip(t, 0.0, 1.0)
+    t = min(1.0, max(0.0, t))
     r = int(color1[0] * (1 - t) + color2[0] * t)
     g = int(color1[1] * (1 - t) + color2[1] * t)
     b = int(color1[2] * (1 - t) + color2[2] * t)
@@ -84,44 +95,57 @@ def gradient(colors: List[Tuple[int, int, int]],
     # Divide LEDs into segments
     segment_size = led_count / (len(colors) - 1)
     
-    for i in range(led_count):
-        # Find which segment we're in
-        segment = min(int(i / segment_size), len(colors) - 2)
-        local_pos = (i - segment * segment_size) / segment_size
-        
-        # Interpolate between segment colors
-        color = interpolate_color(colors[segment], colors[segment + 1], local_pos)
-        result[i] = color
+    # Find each LED's segment and its position within it
+    index = np.arange(led_count)
+    segment = np.minimum((index / segment_size).astype(np.intp), len(colors) - 2)
+    local_pos = np.clip((index - segment * segment_size) / segment_size, 0.0, 1.0)[:, np.newaxis]
+    
+    # Interpolate between segment colors
+    stops = np.asarray(colors, dtype=np.float64)
+    result[:] = stops[segment] * (1 - local_pos) + stops[segment + 1] * local_pos
     
     return result
 
 
+@lru_cache(maxsize=256)
+def _scale_lut(level: int) -> np.ndarray:
+    """256-entry uint8 table mapping each channel value to value * level / 255"""
+    lut = (np.arange(256) * level // 255).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+def _scale_pixels(pixels: np.ndarray, scale: float) -> np.ndarray:
+    """Scale a uint8 pixel array by 0-1, quantized to 1/255 steps so every level shares one cached LUT"""
+    if pixels.dtype != np.uint8:
+        raise ValueError(f"Expected a uint8 pixel array, got {pixels.dtype}")
+    return _scale_lut(round(min(1.0, max(0.0, float(scale))) * 255))[pixels]
+
+
 def apply_brightness(pixels: np.ndarray, brightness: float) -> np.ndarray:
     """
-    Apply brightness scaling to pixel array
+    Apply brightness scaling to a uint8 pixel array
     brightness: 0.0 = off, 1.0 = full brightness
     """
-    brightness = np.clip(brightness, 0.0, 1.0)
-    return (pixels * brightness).astype(np.uint8)
+    return _scale_pixels(pixels, brightness)
 
 
 def fade(pixels: np.ndarray, fade_amount: float) -> np.ndarray:
     """
-    Fade pixels towards black
+    Fade a uint8 pixel array towards black
     fade_amount: 0.0 = no fade, 1.0 = completely black
     """
-    fade_amount = np.clip(fade_amount, 0.0, 1.0)
-    return (pixels * (1.0 - fade_amount)).astype(np.uint8)
+    return _scale_pixels(pixels, 1.0 - float(fade_amount))
 
 
-def hsv_to_rgb(h: np.ndarray, s: float = 1.0, v: float = 1.0) -> np.ndarray:
+def hsv_to_rgb(h: np.ndarray, s=1.0, v=1.0) -> np.ndarray:
     """
-    Convert HSV to RGB using OpenCV for optimal performance
+    Convert HSV to RGB with vectorized NumPy math
     
     Args:
         h: Hue values (0-360) as numpy array
-        s: Saturation (0-1) as scalar
-        v: Value/brightness (0-1) as scalar
+        s: Saturation (0-1) as scalar or array matching h
+        v: Value/brightness (0-1) as scalar or array matching h
         
     Returns:
         RGB array of shape (len(h), 3) with values 0-255
@@ -133,19 +157,54 @@ def hsv_to_rgb(h: np.ndarray, s: float = 1.0, v: float = 1.0) -> np.ndarray:
     s = np.clip(s, 0.0, 1.0)
     v = np.clip(v, 0.0, 1.0)
     
-    # OpenCV uses H: 0-179, S: 0-255, V: 0-255
-    h_cv = ((h % 360) / 2).astype(np.uint8)  # Convert 0-360 to 0-179
-    s_cv = int(s * 255)
-    v_cv = int(v * 255)
+    # Split hue into 60 degree sectors and position within the sector
+    h = (h % 360) / 60.0
+    sector = h.astype(np.intp)
+    f = h - sector
+    # h % 360 rounds to 360.0 for tiny negative hues, which lands in sector 6 (== 0, f == 0)
+    sector %= 6
+    
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    
+    # Pick each pixel's (r, g, b) from the candidate components by sector
+    components = np.stack(np.broadcast_arrays(v, q, p, t))
+    rgb = np.take_along_axis(components, HSV_SECTOR_COMPONENTS[sector].T, axis=0)
+    
+    return (rgb.T * 255 + 0.5).astype(np.uint8)
+
+
+def hsv16_to_rgb(hue: np.ndarray, s: float = 1.0, v: float = 1.0,
+                 out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert fixed-point hues to RGB using integer-only math
+    
+    Args:
+        hue: Hue as an unsigned integer array, 0-65535 = one full turn (0-360)
+        s: Saturation (0-1) as scalar
+        v: Value/brightness (0-1) as scalar
+        out: Optional preallocated (len(hue), 3) uint8 array to write into
+        
+    Returns:
+        RGB array of shape (len(hue), 3) with values 0-255 (out, if given)
+    """
+    s8 = int(min(1.0, max(0.0, s)) * 255)
+    v8 = int(min(1.0, max(0.0, v)) * 255)
+    
+    # Sector is the top of hue * 6, f8 is the 0-255 ramp within the sector
+    scaled = hue.astype(np.uint32) * 6
+    sector = scaled >> 16
+    f8 = (scaled & 0xFFFF) >> 8
     
-    # Create HSV array with shape (1, n_pixels, 3)
-    hsv = np.stack([h_cv, 
-                    np.full_like(h_cv, s_cv),
-                    np.full_like(h_cv, v_cv)], axis=-1)
-    hsv = hsv.reshape(1, -1, 3)
+    p = np.uint32(v8 * (255 - s8) // 255)
+    q = v8 * (65025 - s8 * f8) // 65025
+    t = v8 * (65025 - s8 * (255 - f8)) // 65025
     
-    # Convert to RGB using OpenCV
-    rgb = cv2.cvtColor(hsv, cv2.COLOR_HSV2RGB)
+    components = np.stack(np.broadcast_arrays(np.uint32(v8), q, p, t))
+    rgb = np.take_along_axis(components, HSV_SECTOR_COMPONENTS[sector].T, axis=0)
     
-    # Reshape back to (n_pixels, 3)
-    return rgb.reshape(-1, 3)
\ No newline at end of file
+    if out is None:
+        return rgb.T.astype(np.uint8)
+    np.copyto(out, rgb.T, casting='unsafe')
+    return out
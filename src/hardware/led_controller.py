@@ -4,6 +4,8 @@ LED Controller - Single SPI with parallel pattern generation
 Uses 2 pattern threads but single SPI transmission on 700 LEDs
 """
 
+import os
+import ctypes
 import yaml
 import logging
 import time
@@ -12,8 +14,40 @@ import numpy as np
 from typing import Optional, Dict, Any
 from pi5neo import Pi5Neo
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 logger = logging.getLogger(__name__)
 
+FRAME_SPIN_SLACK = 0.0005  # Seconds before a frame deadline to stop sleeping and spin
+SPI_BYTES_PER_LED = 24     # One SPI byte per WS2811 data bit, 8 bits x 3 channels
+PR_SET_TIMERSLACK = 29     # linux/prctl.h
+
+# SPI byte sent for a WS2811 data bit, indexed by bit value (0xC0=LOW, 0xF8=HIGH)
+WS2811_SYMBOLS = np.array([0xC0, 0xF8], dtype=np.uint8)
+# The 8 SPI bytes for every colour byte value, MSB first - one gather encodes a whole frame
+WS2811_BYTE_LUT = WS2811_SYMBOLS[np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)]
+GRB_ORDER = np.array([1, 0, 2])
+
+# Ready bits each pattern thread sets once its zone buffer holds a finished frame
+CAP_READY = 0b01
+STEM_READY = 0b10
+ZONES_READY = CAP_READY | STEM_READY
+
+
+def _make_ws2811_encoder(led_count: int):
+    """Build a WS2811 encoder specialized for a fixed LED count, with its scratch buffer preallocated"""
+    grb = np.empty((led_count, 3), dtype=np.uint8)
+    
+    def encode(pixels: np.ndarray, out: np.ndarray):
+        """Encode RGB pixels into the WS2811 SPI bitstream (GRB wire order) in place"""
+        np.take(pixels, GRB_ORDER, axis=1, out=grb)
+        np.take(WS2811_BYTE_LUT, grb.reshape(-1), axis=0, out=out.reshape(-1, 8))
+    
+    return encode
+
 
 class LEDController:
     """Manages LED strips with parallel pattern generation on single SPI"""
@@ -23,7 +57,7 @@ class LEDController:
         # Load configuration
         try:
             with open(config_path, 'r') as f:
-                self.config = yaml.safe_load(f)
+                self.config = yaml.load(f, Loader=YamlLoader)
         except (FileNotFoundError, yaml.YAMLError) as e:
             logger.error(f"Failed to load config from {config_path}: {e}")
             raise
@@ -53,26 +87,52 @@ class LEDController:
         if 'ws2811_latch_delay_ms' not in timing_config:
             raise ValueError("Config missing 'timing.ws2811_latch_delay_ms'")
         
+        if 'max_consecutive_errors' not in timing_config:
+            raise ValueError("Config missing 'timing.max_consecutive_errors'")
+        
         self.latch_delay = timing_config['ws2811_latch_delay_ms'] / 1000.0
+        self.max_consecutive_errors = timing_config['max_consecutive_errors']
         logger.info(f"Loaded latch_delay: {self.latch_delay}s ({timing_config['ws2811_latch_delay_ms']}ms)")
         
+        # Get performance config - caps transmit rate
+        if 'performance' not in self.config:
+            raise ValueError(f"Config missing 'performance' section in {config_path}")
+        performance_config = self.config['performance']
+        
+        if 'max_fps' not in performance_config:
+            raise ValueError("Config missing 'performance.max_fps'")
+        if performance_config['max_fps'] <= 0:
+            raise ValueError(f"performance.max_fps must be positive, got {performance_config['max_fps']}")
+        
+        self.frame_interval = 1.0 / performance_config['max_fps']
+        
+        if 'realtime' not in performance_config:
+            raise ValueError("Config missing 'performance.realtime'")
+        self.realtime = performance_config['realtime']
+        if self.realtime:
+            if 'spi_cpu' not in performance_config:
+                raise ValueError("Config missing 'performance.spi_cpu' (required when realtime is enabled)")
+            if 'spi_priority' not in performance_config:
+                raise ValueError("Config missing 'performance.spi_priority' (required when realtime is enabled)")
+            if 'cap_cpu' not in performance_config:
+                raise ValueError("Config missing 'performance.cap_cpu' (required when realtime is enabled)")
+            if 'stem_cpu' not in performance_config:
+                raise ValueError("Config missing 'performance.stem_cpu' (required when realtime is enabled)")
+            self.spi_cpu = performance_config['spi_cpu']
+            self.spi_priority = performance_config['spi_priority']
+            self.cap_cpu = performance_config['cap_cpu']
+            self.stem_cpu = performance_config['stem_cpu']
+        
         # Get LED counts from config
         if 'strips' not in self.config:
             raise ValueError(f"Config missing 'strips' section in {config_path}")
             
-        cap_config = None
-        stem_config = None
-        for strip in self.config['strips']:
-            if strip['id'] == 'cap_exterior':
-                cap_config = strip
-            elif strip['id'] == 'stem_interior':
-                stem_config = strip
-        
-        if not cap_config or not stem_config:
+        strips = {strip['id']: strip for strip in self.config['strips']}
+        if 'cap_exterior' not in strips or 'stem_interior' not in strips:
             raise ValueError("Config must define 'cap_exterior' and 'stem_interior' strips")
         
-        self.cap_led_count = cap_config['led_count']
-        self.stem_led_count = stem_config['led_count']
+        self.cap_led_count = strips['cap_exterior']['led_count']
+        self.stem_led_count = strips['stem_interior']['led_count']
         self.total_leds = self.cap_led_count + self.stem_led_count
         
         # Create single SPI instance for all LEDs
@@ -83,15 +143,29 @@ class LEDController:
             spi_speed_khz=self.spi_speed
         )
         
+        # Frames bypass Pi5Neo's per-LED path and go straight to its spidev handle. Pi5Neo
+        # clocks SPI at 8 SPI bits per WS2811 bit (spi_speed_khz * 1024 * 8 Hz), which the
+        # one-SPI-byte-per-data-bit symbols rely on
+        spidev = self.spi.spi
+        expected_hz = self.spi_speed * 1024 * 8
+        if spidev.max_speed_hz != expected_hz:
+            raise RuntimeError(
+                f"SPI clock is {spidev.max_speed_hz}Hz, expected {expected_hz}Hz for spi_speed_khz={self.spi_speed}"
+            )
+        self._spi_write = spidev.writebytes2
+        
+        # Persistent SPI bitstream for the whole chain, encoded in one pass
+        self._tx_buffer = np.zeros(self.total_leds * SPI_BYTES_PER_LED, dtype=np.uint8)
+        self._encode_frame = _make_ws2811_encoder(self.total_leds)
+        
         # Patterns
         self.cap_pattern = None
         self.stem_pattern = None
         
-        # Buffers for pattern outputs
-        self.cap_buffer = np.zeros((self.cap_led_count, 3), dtype=np.uint8)
-        self.stem_buffer = np.zeros((self.stem_led_count, 3), dtype=np.uint8)
-        self.cap_buffer_lock = threading.Lock()
-        self.stem_buffer_lock = threading.Lock()
+        # Contiguous frame for the whole chain; patterns render into their zone's view
+        self._frame = np.zeros((self.total_leds, 3), dtype=np.uint8)
+        self.cap_buffer = self._frame[:self.cap_led_count]
+        self.stem_buffer = self._frame[self.cap_led_count:]
         
         # Thread control
         self.running = False
@@ -99,18 +173,25 @@ class LEDController:
         self.stem_thread = None
         self.spi_thread = None
         
-        # Frame synchronization
-        self.cap_ready = threading.Event()
-        self.stem_ready = threading.Event()
+        # Frame synchronization - ready/consumed hand each zone buffer between its pattern
+        # thread and the SPI thread, so exactly one of them owns it at a time (no locks).
+        # Both zones report readiness into one mask so the SPI thread sleeps on a single wait
+        self._frame_ready = threading.Condition()
+        self._ready_mask = 0
         self.cap_consumed = threading.Event()
         self.stem_consumed = threading.Event()
         self.cap_consumed.set()
         self.stem_consumed.set()
         
         # Performance tracking
-        self.frames_sent = 0
-        self.last_fps_time = time.time()
+        self.frames_sent = 0  # Lifetime count of transmitted frames, only incremented by the SPI thread
+        self.frames_skipped = 0  # Frames identical to the strip's contents, not retransmitted
+        self.last_fps_time = time.monotonic()
+        self._frames_at_last_fps = 0
         self.current_fps = 0
+        self.spi_errors = 0  # Consecutive transmit failures, reset on success
+        self.cap_pattern_errors = 0  # Consecutive render failures, reset on success
+        self.stem_pattern_errors = 0
         
         # Timing metrics (last frame only)
         self.last_pattern_wait_ms = 0
@@ -119,6 +200,38 @@ class LEDController:
         self.last_cap_generation_ms = 0
         self.last_stem_generation_ms = 0
         
+        # Health/stats reports are refreshed in place on each call rather than rebuilt
+        self._health = {
+            'running': False,
+            'cap': {
+                'pattern_alive': False,
+                'spi_alive': False,
+                'fps': 0,
+                'frames_generated': 0,
+                'pattern_errors': 0,
+                'spi_errors': 0
+            },
+            'stem': {
+                'pattern_alive': False,
+                'spi_alive': False,
+                'fps': 0,
+                'frames_generated': 0,
+                'pattern_errors': 0,
+                'spi_errors': 0
+            },
+            'frames_sent': 0,
+            'frames_skipped': 0,
+            'total_leds': self.total_leds
+        }
+        self._stats = {
+            'cap_fps': 0,
+            'stem_fps': 0,
+            'cap_frames': 0,
+            'stem_frames': 0,
+            'cap_errors': 0,
+            'stem_errors': 0
+        }
+        
         logger.info(f"LED Controller initialized: {self.cap_led_count} cap + {self.stem_led_count} stem = {self.total_leds} total")
     
     def _set_pattern(self, pattern, expected_count: int, zone_name: str):
@@ -172,9 +285,11 @@ class LEDController:
         logger.info("Stopping LED controller")
         self.running = False
         
-        # Signal threads to wake up
+        # Signal threads to wake up - their waits have no timeout, so this is what ends them
         self.cap_consumed.set()
         self.stem_consumed.set()
+        with self._frame_ready:
+            self._frame_ready.notify()
         
         # Wait for threads to finish
         if self.cap_thread and self.cap_thread.is_alive():
@@ -217,38 +332,43 @@ class LEDController:
             self.stem_pattern.set_brightness(brightness / 255.0)
     
     def get_health(self) -> Dict[str, Any]:
-        """Get health status of all components"""
-        return {
-            'running': self.running,
-            'cap': {
-                'pattern_alive': self.cap_thread.is_alive() if self.cap_thread else False,
-                'spi_alive': self.spi_thread.is_alive() if self.spi_thread else False,
-                'fps': self.current_fps,
-                'frames_generated': 0,
-                'pattern_errors': 0,
-                'spi_errors': 0
-            },
-            'stem': {
-                'pattern_alive': self.stem_thread.is_alive() if self.stem_thread else False,
-                'spi_alive': self.spi_thread.is_alive() if self.spi_thread else False,
-                'fps': self.current_fps,
-                'frames_generated': 0,
-                'pattern_errors': 0,
-                'spi_errors': 0
-            },
-            'total_leds': self.total_leds
-        }
+        """Get health status of all components - the same dict is refreshed on every call"""
+        spi_alive = self.spi_thread.is_alive() if self.spi_thread else False
+        health = self._health
+        health['running'] = self.running
+        health['frames_sent'] = self.frames_sent
+        health['frames_skipped'] = self.frames_skipped
+        
+        cap = health['cap']
+        cap['pattern_alive'] = self.cap_thread.is_alive() if self.cap_thread else False
+        cap['spi_alive'] = spi_alive
+        cap['fps'] = self.current_fps
+        cap['pattern_errors'] = self.cap_pattern_errors
+        cap['spi_errors'] = self.spi_errors
+        
+        stem = health['stem']
+        stem['pattern_alive'] = self.stem_thread.is_alive() if self.stem_thread else False
+        stem['spi_alive'] = spi_alive
+        stem['fps'] = self.current_fps
+        stem['pattern_errors'] = self.stem_pattern_errors
+        stem['spi_errors'] = self.spi_errors
+        return health
     
     def get_stats(self) -> Dict[str, Any]:
-        """Get performance statistics"""
-        return {
-            'cap_fps': self.current_fps,
-            'stem_fps': self.current_fps,
-            'cap_frames': self.frames_sent,
-            'stem_frames': self.frames_sent,
-            'cap_errors': 0,
-            'stem_errors': 0
-        }
+        """Get performance statistics - FPS is averaged over the time since the previous call.
+        
+        The same dict is refreshed on every call.
+        """
+        now = time.monotonic()
+        frames = self.frames_sent
+        self.current_fps = (frames - self._frames_at_last_fps) / (now - self.last_fps_time)
+        self._frames_at_last_fps = frames
+        self.last_fps_time = now
+        
+        stats = self._stats
+        stats['cap_fps'] = stats['stem_fps'] = self.current_fps
+        stats['cap_frames'] = stats['stem_frames'] = frames
+        return stats
     
     def cleanup(self):
         """Clean shutdown of all resources"""
@@ -267,25 +387,43 @@ class LEDController:
         """Thread function for cap pattern generation"""
         logger.debug("Cap pattern thread started")
         
+        # Patterns cannot change while running, so bind hot-loop lookups once
+        render_into = self.cap_pattern.render_into
+        consumed = self.cap_consumed
+        frame_ready = self._frame_ready
+        buffer = self.cap_buffer
+        monotonic = time.monotonic
+        
+        if self.realtime:
+            try:
+                os.sched_setaffinity(0, {self.cap_cpu})
+                logger.info(f"Cap pattern thread pinned to CPU {self.cap_cpu}")
+            except OSError as e:
+                logger.warning(f"Could not pin cap pattern thread to CPU {self.cap_cpu}, running unpinned: {e}")
+        
         while self.running:
+            consumed.wait()
+            if not self.running:
+                break
+            consumed.clear()
+            
+            # A failed render leaves the zone showing its previous frame
+            gen_start = monotonic()
             try:
-                self.cap_consumed.wait(timeout=0.1)
-                if not self.running:
-                    break
-                self.cap_consumed.clear()
-                
-                gen_start = time.time()
-                pixels = self.cap_pattern.render()
-                self.last_cap_generation_ms = (time.time() - gen_start) * 1000
-                
-                with self.cap_buffer_lock:
-                    self.cap_buffer[:] = pixels
-                
-                self.cap_ready.set()
-                
+                render_into(buffer)
             except Exception as e:
-                logger.error(f"Cap pattern error: {e}")
-                time.sleep(0.1)
+                self.cap_pattern_errors += 1
+                logger.error(f"Cap pattern error ({self.cap_pattern_errors} consecutive): {e}", exc_info=True)
+                if self.cap_pattern_errors >= self.max_consecutive_errors:
+                    break
+            else:
+                self.cap_pattern_errors = 0
+            self.last_cap_generation_ms = (monotonic() - gen_start) * 1000
+            
+            with frame_ready:
+                self._ready_mask |= CAP_READY
+                if self._ready_mask == ZONES_READY:
+                    frame_ready.notify()
         
         logger.debug("Cap pattern thread exited")
     
@@ -293,76 +431,162 @@ class LEDController:
         """Thread function for stem pattern generation"""
         logger.debug("Stem pattern thread started")
         
+        # Patterns cannot change while running, so bind hot-loop lookups once
+        render_into = self.stem_pattern.render_into
+        consumed = self.stem_consumed
+        frame_ready = self._frame_ready
+        buffer = self.stem_buffer
+        monotonic = time.monotonic
+        
+        if self.realtime:
+            try:
+                os.sched_setaffinity(0, {self.stem_cpu})
+                logger.info(f"Stem pattern thread pinned to CPU {self.stem_cpu}")
+            except OSError as e:
+                logger.warning(f"Could not pin stem pattern thread to CPU {self.stem_cpu}, running unpinned: {e}")
+        
         while self.running:
+            consumed.wait()
+            if not self.running:
+                break
+            consumed.clear()
+            
+            # A failed render leaves the zone showing its previous frame
+            gen_start = monotonic()
             try:
-                self.stem_consumed.wait(timeout=0.1)
-                if not self.running:
-                    break
-                self.stem_consumed.clear()
-                
-                gen_start = time.time()
-                pixels = self.stem_pattern.render()
-                self.last_stem_generation_ms = (time.time() - gen_start) * 1000
-                
-                with self.stem_buffer_lock:
-                    self.stem_buffer[:] = pixels
-                
-                self.stem_ready.set()
-                
+                render_into(buffer)
             except Exception as e:
-                logger.error(f"Stem pattern error: {e}")
-                time.sleep(0.1)
+                self.stem_pattern_errors += 1
+                logger.error(f"Stem pattern error ({self.stem_pattern_errors} consecutive): {e}", exc_info=True)
+                if self.stem_pattern_errors >= self.max_consecutive_errors:
+                    break
+            else:
+                self.stem_pattern_errors = 0
+            self.last_stem_generation_ms = (monotonic() - gen_start) * 1000
+            
+            with frame_ready:
+                self._ready_mask |= STEM_READY
+                if self._ready_mask == ZONES_READY:
+                    frame_ready.notify()
         
         logger.debug("Stem pattern thread exited")
     
+    def _configure_spi_realtime(self):
+        """Pin the calling thread to the SPI core with SCHED_FIFO and minimal timer slack.
+        
+        Each step is best effort - on failure the SPI thread keeps running without it.
+        """
+        try:
+            os.sched_setaffinity(0, {self.spi_cpu})
+            logger.info(f"SPI thread pinned to CPU {self.spi_cpu}")
+        except OSError as e:
+            logger.warning(f"Could not pin SPI thread to CPU {self.spi_cpu}, running unpinned: {e}")
+        
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.spi_priority))
+            logger.info(f"SPI thread running SCHED_FIFO priority {self.spi_priority}")
+        except PermissionError:
+            logger.warning("SCHED_FIFO needs root or CAP_SYS_NICE, SPI thread running at normal priority")
+        except OSError as e:
+            logger.warning(f"Could not set SCHED_FIFO for SPI thread, running at normal priority: {e}")
+        
+        try:
+            libc = ctypes.CDLL('libc.so.6', use_errno=True)
+        except OSError as e:
+            logger.warning(f"Could not load libc to reduce timer slack: {e}")
+            return
+        if libc.prctl(PR_SET_TIMERSLACK, 1, 0, 0, 0) != 0:
+            errno = ctypes.get_errno()
+            logger.warning(f"prctl(PR_SET_TIMERSLACK) failed, keeping default timer slack: {os.strerror(errno)}")
+    
+    def _transmit(self) -> bool:
+        """Send the encoded bitstream and latch - returns False on a transient SPI I/O error"""
+        try:
+            self._spi_write(self._tx_buffer)
+        except OSError as e:
+            logger.warning(f"SPI transmit failed: {e}")
+            return False
+        time.sleep(self.latch_delay)
+        return True
+    
     def _spi_thread(self):
         """Thread function for SPI transmission"""
         logger.debug("SPI thread started")
         
-        while self.running:
-            try:
-                wait_start = time.time()
-                self.cap_ready.wait(timeout=0.1)
-                self.stem_ready.wait(timeout=0.1)
-                self.last_pattern_wait_ms = (time.time() - wait_start) * 1000
+        frame_ready = self._frame_ready
+        cap_consumed = self.cap_consumed
+        stem_consumed = self.stem_consumed
+        transmit = self._transmit
+        encode_frame = self._encode_frame
+        frame = self._frame
+        tx_buffer = self._tx_buffer
+        array_equal = np.array_equal
+        
+        # Last frame handed to transmit - WS2811s hold their colours, so an identical frame
+        # needs no re-encode or retransmit. The strip's state at startup is unknown (a killed
+        # run can leave it lit), so the first frame is always sent
+        sent_frame = np.zeros_like(frame)
+        pending = True  # Encoded frame not yet delivered successfully
+        monotonic = time.monotonic
+        
+        def zones_ready():
+            return self._ready_mask == ZONES_READY or not self.running
+        
+        try:
+            if self.realtime:
+                self._configure_spi_realtime()
+            
+            frame_end = monotonic()
+            next_deadline = frame_end + self.frame_interval
+            
+            while self.running:
+                with frame_ready:
+                    frame_ready.wait_for(zones_ready)
+                    self._ready_mask = 0
+                copy_start = monotonic()
+                self.last_pattern_wait_ms = (copy_start - frame_end) * 1000
                 
                 if not self.running:
                     break
                 
-                self.cap_ready.clear()
-                self.stem_ready.clear()
+                if pending or not array_equal(frame, sent_frame):
+                    encode_frame(frame, tx_buffer)
+                    np.copyto(sent_frame, frame)
+                    pending = True
+                now = monotonic()
+                self.last_buffer_prep_ms = (now - copy_start) * 1000
                 
-                copy_start = time.time()
-                with self.cap_buffer_lock:
-                    cap_pixels = self.cap_buffer.copy()
-                with self.stem_buffer_lock:
-                    stem_pixels = self.stem_buffer.copy()
+                # Frame is captured in the bitstream - let patterns render the next one during transmit
+                cap_consumed.set()
+                stem_consumed.set()
                 
-                for i in range(self.cap_led_count):
-                    r, g, b = cap_pixels[i]
-                    self.spi.set_led_color(i, r, g, b)
+                # Absolute deadline pacing - sleep coarse, spin the last slack to avoid drift
+                if now - next_deadline > self.frame_interval:
+                    next_deadline = now
+                else:
+                    remaining = next_deadline - now
+                    if remaining > FRAME_SPIN_SLACK:
+                        time.sleep(remaining - FRAME_SPIN_SLACK)
+                    while monotonic() < next_deadline:
+                        pass
+                next_deadline += self.frame_interval
                 
-                for i in range(self.stem_led_count):
-                    r, g, b = stem_pixels[i]
-                    self.spi.set_led_color(self.cap_led_count + i, r, g, b)
-                self.last_buffer_prep_ms = (time.time() - copy_start) * 1000
-                
-                spi_start = time.time()
-                self.spi.update_strip(sleep_duration=self.latch_delay)
-                self.last_spi_transmit_ms = (time.time() - spi_start) * 1000
-                
-                self.cap_consumed.set()
-                self.stem_consumed.set()
-                
-                self.frames_sent += 1
-                current_time = time.time()
-                if current_time - self.last_fps_time >= 1.0:
-                    self.current_fps = self.frames_sent / (current_time - self.last_fps_time)
-                    self.frames_sent = 0
-                    self.last_fps_time = current_time
-                
-            except Exception as e:
-                logger.error(f"SPI thread error: {e}")
-                time.sleep(0.1)
+                if pending:
+                    spi_start = monotonic()
+                    if transmit():
+                        self.spi_errors = 0
+                        self.frames_sent += 1
+                        pending = False
+                    else:
+                        self.spi_errors += 1
+                        if self.spi_errors >= self.max_consecutive_errors:
+                            raise RuntimeError(f"SPI transmit failed {self.spi_errors} consecutive times")
+                    frame_end = monotonic()
+                    self.last_spi_transmit_ms = (frame_end - spi_start) * 1000
+                else:
+                    frame_end = monotonic()
+                    self.frames_skipped += 1
+        except Exception as e:
+            logger.error(f"SPI thread error: {e}", exc_info=True)
         
         logger.debug("SPI thread exited")
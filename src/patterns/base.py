@@ -24,9 +24,9 @@ class Pattern(ABC):
         self.frame_time = 1.0 / fps
         
         # Pattern state
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         self.frame_number = 0
-        self.last_update = time.time()
+        self.last_update = time.monotonic()
         
         # Output buffer
         self.pixels = np.zeros((led_count, 3), dtype=np.uint8)
@@ -56,9 +56,9 @@ class Pattern(ABC):
         """
         pass
     
-    def render(self) -> np.ndarray:
-        """Generate next frame - called when controller needs new data"""
-        current_time = time.time()
+    def _advance(self) -> np.ndarray:
+        """Advance the pattern one frame and return its internal pixel buffer"""
+        current_time = time.monotonic()
         delta_time = current_time - self.last_update
         
         # Always generate fresh frame - controller handles timing
@@ -66,7 +66,15 @@ class Pattern(ABC):
         self.last_update = current_time
         self.frame_number += 1
         
-        return self.pixels.copy()
+        return self.pixels
+    
+    def render(self) -> np.ndarray:
+        """Generate next frame - returns a copy the caller may keep"""
+        return self._advance().copy()
+    
+    def render_into(self, out: np.ndarray):
+        """Generate next frame directly into a caller-owned (led_count, 3) uint8 buffer"""
+        np.copyto(out, self._advance())
     
     def set_param(self, name: str, value: Any):
         """Set a pattern parameter"""
@@ -81,11 +89,11 @@ class Pattern(ABC):
     
     def get_time(self) -> float:
         """Get time since pattern started"""
-        return time.time() - self.start_time
+        return time.monotonic() - self.start_time
     
     def reset(self):
         """Reset pattern to initial state"""
-        self.start_time = time.time()
+        self.start_time = time.monotonic()
         self.frame_number = 0
-        self.last_update = time.time()
+        self.last_update = time.monotonic()
         self.pixels.fill(0)
\ No newline at end of file
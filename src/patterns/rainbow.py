@@ -7,13 +7,22 @@ import numpy as np
 from typing import Dict, Any
 from .base import Pattern
 from .registry import PatternRegistry
-from effects.colors import hsv_to_rgb
+from effects.colors import hsv16_to_rgb
 
 
 @PatternRegistry.register("rainbow")
 class RainbowWave(Pattern):
     """Rainbow wave that travels along the LED strip"""
     
+    def __init__(self, led_count: int, fps: float = 30.0):
+        super().__init__(led_count, fps)
+        
+        # Normalized position across strip in 16-bit fixed point (65536 = 1.0) - constant for the strip
+        self.positions = (np.arange(led_count, dtype=np.uint64) << 16) // led_count
+        
+        # Per-frame hue scratch buffer, reused to avoid allocation
+        self.hues = np.empty(led_count, dtype=np.uint64)
+    
     def get_default_params(self) -> Dict[str, Any]:
         return {
             'rainbow_count': 0.3,   # Number of complete rainbows visible (0.3 = partial rainbow for smooth gradient)
@@ -25,19 +34,22 @@ class RainbowWave(Pattern):
         # Calculate phase (0-1) based on time
         phase = (self.get_time() / self.params['cycle_time']) % 1.0
         
-        # Create normalized position array (0-1 across strip)
-        positions = np.arange(self.led_count) / self.led_count
-        
-        # Calculate hue for each LED
+        # Calculate 16-bit fixed-point hue for each LED in place
         # rainbow_count controls how many rainbows fit across the strip
         # phase shifts the pattern over time
-        hues = (((positions + phase) * self.params['rainbow_count']) % 1.0) * 360
+        hues = np.add(self.positions, int(phase * 65536), out=self.hues)
+        # Reduced mod 2**64 so negative counts (reversed rainbow) wrap instead of overflowing;
+        # only bits 16-31 of the product are kept, and those survive the wraparound
+        hues *= np.uint64(int(self.params['rainbow_count'] * 65536) & 0xFFFFFFFFFFFFFFFF)
+        hues >>= 16
+        hues &= 0xFFFF
         
-        # Convert HSV to RGB with hardware brightness applied
-        self.pixels = hsv_to_rgb(
+        # Convert HSV to RGB with hardware brightness applied, into the preallocated frame
+        hsv16_to_rgb(
             hues, 
             self.params['saturation'], 
-            self.brightness
+            self.brightness,
+            out=self.pixels
         )
         
         return self.pixels
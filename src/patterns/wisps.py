@@ -186,7 +186,8 @@ class Wisps(Pattern):
             if not self.spawn_firefly():
                 break
         
-        # Update all active fireflies
+        # Update all active fireflies, collecting lit ones for a single batched conversion
+        lit = []
         for firefly in self.fireflies:
             if not firefly.active:
                 continue
@@ -200,14 +201,13 @@ class Wisps(Pattern):
             firefly_brightness = self.calculate_brightness(firefly, current_time)
             final_brightness = firefly_brightness * self.brightness * (1.0 + self.audio_boost * 0.5)
             
-            # Convert HSV to RGB
             if final_brightness > 0.001:  # Skip if too dim
-                rgb = hsv_to_rgb(
-                    np.array([firefly.hue]),
-                    firefly.saturation,
-                    final_brightness
-                )
-                self.pixels[firefly.position] = rgb[0]
+                lit.append((firefly.position, firefly.hue, firefly.saturation, final_brightness))
+        
+        # Convert HSV to RGB for every lit firefly in one vectorized call
+        if lit:
+            positions, hues, saturations, values = (np.array(column) for column in zip(*lit))
+            self.pixels[positions] = hsv_to_rgb(hues, saturations, values)
         
         return self.pixels
     